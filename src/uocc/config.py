@@ -2,31 +2,63 @@
 config.py: Configuration values. Secrets to be handled with Secrets Manager
 """
 
+import functools
 import logging
 import socket
 import urllib.request
 
 SKID_NAME = "uocc-skid"
-#: Try to get project id from GCP metadata server for hostname. If it's empty or errors out, revert to local hostname
-try:
-    url = "http://metadata.google.internal/computeMetadata/v1/project/project-id"
-    req = urllib.request.Request(url)
-    req.add_header("Metadata-Flavor", "Google")
-    project_id = urllib.request.urlopen(req).read().decode()
-    if not project_id:
-        raise ValueError
-    HOST_NAME = project_id
-except Exception:
-    HOST_NAME = socket.gethostname()
+
+
+@functools.lru_cache(maxsize=1)
+def _resolve_host_name():
+    """Get the project id from the GCP metadata server for the hostname, falling back to the local hostname
+
+    Only looked up when HOST_NAME or SENDGRID_SETTINGS is first used. The short timeout keeps non-GCP environments (or
+    ones where the metadata server is blocked) from stalling.
+
+    Returns:
+        str: The GCP project id if available, otherwise the local hostname
+    """
+
+    try:
+        url = "http://metadata.google.internal/computeMetadata/v1/project/project-id"
+        req = urllib.request.Request(url)
+        req.add_header("Metadata-Flavor", "Google")
+        project_id = urllib.request.urlopen(req, timeout=0.5).read().decode()
+        if not project_id:
+            raise ValueError
+        return project_id
+    except Exception:
+        return socket.gethostname()
+
+
+@functools.lru_cache(maxsize=1)
+def _sendgrid_settings():
+    """Settings for SendGridHandler, built on first use so the host name lookup doesn't happen on import"""
+
+    return {
+        "from_address": "noreply@utah.gov",
+        "to_addresses": [
+            "ugrc-developers@utah.gov",
+            "deq-wmrc-recycling-map@utah.gov",
+        ],
+        "prefix": f"{SKID_NAME} on {_resolve_host_name()}: ",
+    }
+
 
 AGOL_ORG = "https://utahdeq.maps.arcgis.com"
-SENDGRID_SETTINGS = {  #: Settings for SendGridHandler
-    "from_address": "noreply@utah.gov",
-    "to_addresses": [
-        "ugrc-developers@utah.gov",
-        "deq-wmrc-recycling-map@utah.gov",
-    ],
-    "prefix": f"{SKID_NAME} on {HOST_NAME}: ",
-}
 LOG_LEVEL = logging.INFO
 LOG_FILE_NAME = "log"
+#: Number of LHD sheets to load at once; kept small to stay under the Sheets API per-user quota
+LHD_LOAD_WORKERS = 4
+
+
+def __getattr__(name):
+    #: HOST_NAME and SENDGRID_SETTINGS are resolved lazily (and only once) rather than probing the metadata server on
+    #: import
+    if name == "HOST_NAME":
+        return _resolve_host_name()
+    if name == "SENDGRID_SETTINGS":
+        return _sendgrid_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,12 +4,18 @@
 Run the uocc-skid as a Cloud Run instance. Uses the entry point defined in setup.py and the Dockerfile.
 """
 
+import atexit
+import functools
 import json
 import logging
+import logging.handlers
+import queue
 import re
-import shutil
 import sys
+import threading
+import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from tempfile import TemporaryDirectory
@@ -31,15 +37,212 @@ except ImportError:
     import version
 
 
+#: Our log format doesn't use thread or process info, so don't spend time gathering it for every record. findCaller
+#: (logging._srcfile) is left on because the format includes %(lineno)s.
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+_WARNINGS_CAPTURED = False
+
+#: The stdout QueueListener of the most recent Skid; only one runs at a time per process
+_LOG_LISTENER = None
+
+_FORMATTER = logging.Formatter(
+    fmt="%(levelname)-7s %(asctime)s %(name)15s:%(lineno)5s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+)
+
+#: Local health department abbreviation for each county
+_COUNTIES_TO_LHD = {
+    "Box Elder": "BRHD",
+    "Cache": "BRHD",
+    "Rich": "BRHD",
+    "Weber": "WMHD",
+    "Morgan": "WMHD",
+    "Davis": "DCHD",
+    "Salt Lake": "SLCoHD",
+    "Utah": "UCHD",
+    "Wasatch": "WCHD",
+    "Summit": "SCHD",
+    "Juab": "CUHD",
+    "Millard": "CUHD",
+    "Piute": "CUHD",
+    "Sanpete": "CUHD",
+    "Sevier": "CUHD",
+    "Wayne": "CUHD",
+    "Tooele": "TCoHD",
+    "Beaver": "SWUHD",
+    "Iron": "SWUHD",
+    "Kane": "SWUHD",
+    "Washington": "SWUHD",
+    "Garfield": "SWUHD",
+    "San Juan": "SJHD",
+    "Grand": "SEUHD",
+    "Emery": "SEUHD",
+    "Carbon": "SEUHD",
+    "Duchesne": "TCHD",
+    "Daggett": "TCHD",
+    "Uintah": "TCHD",
+}
+
+
+#: Contact info columns in the locations sheet; contacts come from the contacts sheet instead
+_LOCATION_COLUMNS_TO_DROP = [
+    "Local Health Department",
+    "UOCC Email Address",
+    "Corporate Email Address",
+    "Corporate Contact Name",
+    "UOCC Contact Name",
+]
+
+#: Characters Survey123 can't handle in column names, for use with str.translate
+_FIELD_NAME_DELETIONS = str.maketrans("", "", "\n #")
+
+#: Survey question numbers ("1. ") and sub-question numbers ("1a. ") in the field aliases
+_QUESTION_NUMBER_REGEX = re.compile(r"\d{1,2}\. ")
+_SUB_QUESTION_NUMBER_REGEX = re.compile(r"\d{1,2}[a-z]{1}\. ")
+
+#: Survey media file types that are already compressed and are just stored when rebuilding the survey zip
+_PRECOMPRESSED_SUFFIXES = {".docx", ".gif", ".jpeg", ".jpg", ".mp3", ".mp4", ".pdf", ".png", ".xlsx", ".zip"}
+
+#: GIS objects keyed on (org, user) so a warm instance can skip the AGOL sign-in
+_GIS_CACHE = {}
+
+
+def _get_gis(org: str, user: str, password: str) -> arcgis.gis.GIS:
+    """Get a signed-in GIS object, reusing one from an earlier run in this process if available
+
+    Args:
+        org (str): The AGOL org URL
+        user (str): The AGOL username
+        password (str): The AGOL password
+
+    Returns:
+        arcgis.gis.GIS: The GIS object for the org/user
+    """
+
+    key = (org, user)
+    if key not in _GIS_CACHE:
+        _GIS_CACHE[key] = arcgis.gis.GIS(org, user, password)
+
+    return _GIS_CACHE[key]
+
+
+def _stop_log_listener():
+    """Stop the running stdout QueueListener, if any, writing out anything still queued"""
+
+    global _LOG_LISTENER
+    if _LOG_LISTENER is not None:
+        _LOG_LISTENER.stop()
+        _LOG_LISTENER = None
+
+
+#: The listener is left running after process() so anything logged afterwards (like the supervisor's global error
+#: handler messages) still reaches stdout; this drains and stops it at exit
+atexit.register(_stop_log_listener)
+
+
+def _quote_worksheet_title(worksheet_title: str) -> str:
+    """Quote a worksheet title for A1 notation so spaces and apostrophes are safe; on its own it ranges the whole sheet
+
+    Args:
+        worksheet_title (str): The worksheet's title
+
+    Returns:
+        str: The quoted title, like 'Bob''s Sheet'
+    """
+
+    return "'{}'".format(worksheet_title.replace("'", "''"))
+
+
+def _worksheet_range(worksheet_title: str, column_number: int | None = None) -> str:
+    """Build an A1 range for a worksheet's header row or one of its whole columns
+
+    Args:
+        worksheet_title (str): The worksheet's title
+        column_number (int | None, optional): 1-based column to select. Defaults to None for the header row.
+
+    Returns:
+        str: The A1 range, like 'Sheet 1'!1:1 or 'Sheet 1'!AB:AB
+    """
+
+    quoted_title = _quote_worksheet_title(worksheet_title)
+    if column_number is None:
+        return f"{quoted_title}!1:1"
+
+    column_letters = _column_letters(column_number)
+    return f"{quoted_title}!{column_letters}:{column_letters}"
+
+
+def _worksheet_rows_range(worksheet_title: str, first_row: int, column_count: int) -> str:
+    """Build an A1 range for every column of a worksheet from first_row down to the bottom of the sheet
+
+    Args:
+        worksheet_title (str): The worksheet's title
+        first_row (int): 1-based row to start at
+        column_count (int): Number of columns in the worksheet
+
+    Returns:
+        str: The A1 range, like 'Sheet 1'!A5:Z
+    """
+
+    return f"{_quote_worksheet_title(worksheet_title)}!A{first_row}:{_column_letters(column_count)}"
+
+
+def _column_letters(column_number: int) -> str:
+    """Convert a 1-based column number to its A1 letters, like 28 to AB
+
+    Args:
+        column_number (int): 1-based column number
+
+    Returns:
+        str: The column's letters
+    """
+
+    column_letters = ""
+    while column_number:
+        column_number, remainder = divmod(column_number - 1, 26)
+        column_letters = chr(ord("A") + remainder) + column_letters
+
+    return column_letters
+
+
+@functools.lru_cache(maxsize=2)
+def _load_secrets_file(secrets_path: Path) -> dict:
+    """Read and parse a secrets .json file, caching the result so warm instances don't re-read it
+
+    Args:
+        secrets_path (Path): Path to the secrets .json file
+
+    Returns:
+        dict: The parsed secrets. Callers should copy before modifying, as the cached object is shared.
+    """
+
+    #: json.loads handles UTF-8 bytes directly, so skip building an intermediate str
+    return json.loads(secrets_path.read_bytes())
+
+
+@functools.lru_cache(maxsize=1)
+def _get_google_credentials():
+    """Get (and cache) the Google credentials via ADC
+
+    Returns:
+        google.auth.credentials.Credentials: The default credentials for the environment
+    """
+
+    credentials, _ = google.auth.default()
+    return credentials
+
+
 class Skid:
     def __init__(self):
         self.secrets = SimpleNamespace(**self._get_secrets())
         self.tempdir = TemporaryDirectory(ignore_cleanup_errors=True)
         self.tempdir_path = Path(self.tempdir.name)
-        self.log_name = f"{config.LOG_FILE_NAME}_{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt"
+        self.log_name = f"{config.LOG_FILE_NAME}_{time.strftime('%Y%m%d-%H%M%S')}.txt"
         self.log_path = self.tempdir_path / self.log_name
+        self._thread_gsheets_clients = threading.local()
         self._initialize_supervisor()
-        self.skid_logger = logging.getLogger(config.SKID_NAME)
 
     def __del__(self):
         self.tempdir.cleanup()
@@ -58,19 +261,18 @@ class Skid:
         #: Try to get the secrets from the Cloud Function mount point
         secret_folder = Path("/secrets")
         if secret_folder.exists():
-            secrets_dict = json.loads(Path("/secrets/app/secrets.json").read_text(encoding="utf-8"))
+            secrets_dict = dict(_load_secrets_file(Path("/secrets/app/secrets.json")))
 
         #: Otherwise, try to load a local copy for local development
         else:
             secret_folder = Path(__file__).parent / "secrets"
             try:
-                secrets_dict = json.loads((secret_folder / "secrets.json").read_text(encoding="utf-8"))
+                secrets_dict = dict(_load_secrets_file(secret_folder / "secrets.json"))
             except Exception as e:
                 raise RuntimeError("Secrets folder not found; secrets not loaded.") from e
 
         #: Authenticate with Google via ADC
-        credentials, _ = google.auth.default()
-        secrets_dict["GOOGLE_CREDENTIALS"] = credentials
+        secrets_dict["GOOGLE_CREDENTIALS"] = _get_google_credentials()
         return secrets_dict
 
     def _initialize_supervisor(self):
@@ -82,29 +284,64 @@ class Skid:
 
         skid_logger = logging.getLogger(config.SKID_NAME)
         skid_logger.setLevel(config.LOG_LEVEL)
+        self.skid_logger = skid_logger
         palletjack_logger = logging.getLogger("palletjack")
         palletjack_logger.setLevel(config.LOG_LEVEL)
+        self.palletjack_logger = palletjack_logger
+
+        #: Drop any handlers left by an earlier Skid in this process so each message isn't handled by all of them.
+        #: Remove from every logger before closing, as the same handlers are shared between loggers.
+        old_handlers = {}
+        for logger in [skid_logger, palletjack_logger]:
+            for handler in logger.handlers[:]:
+                logger.removeHandler(handler)
+                old_handlers[handler] = getattr(handler, "target", None)
+
+        #: Stop the earlier listener so its thread doesn't linger, draining its queue before the handler is closed
+        _stop_log_listener()
+        for handler, target in old_handlers.items():
+            handler.flush()
+            handler.close()
+            #: Closing a MemoryHandler leaves its FileHandler target open
+            if target is not None:
+                target.close()
 
         cli_handler = logging.StreamHandler(sys.stdout)
         cli_handler.setLevel(config.LOG_LEVEL)
-        formatter = logging.Formatter(
-            fmt="%(levelname)-7s %(asctime)s %(name)15s:%(lineno)5s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-        )
-        cli_handler.setFormatter(formatter)
+        cli_handler.setFormatter(_FORMATTER)
+
+        file_handler = logging.FileHandler(self.log_path, mode="w")
+        file_handler.setLevel(config.LOG_LEVEL)
+        file_handler.setFormatter(_FORMATTER)
 
-        log_handler = logging.FileHandler(self.log_path, mode="w")
+        #: Buffer the file writes; anything at WARNING or above (including the supervisor's global error handler
+        #: messages) flushes immediately so the log attached to error emails is complete
+        log_handler = logging.handlers.MemoryHandler(
+            capacity=1024, flushLevel=logging.WARNING, target=file_handler, flushOnClose=True
+        )
         log_handler.setLevel(config.LOG_LEVEL)
-        log_handler.setFormatter(formatter)
+        self.log_handler = log_handler
+
+        #: Hand stdout writes off to a background thread. The file handler stays on the calling thread so the log is
+        #: fully written before the supervisor attaches it to an email.
+        cli_queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+        global _LOG_LISTENER
+        _LOG_LISTENER = logging.handlers.QueueListener(cli_queue_handler.queue, cli_handler, respect_handler_level=True)
+        _LOG_LISTENER.start()
 
-        skid_logger.addHandler(cli_handler)
+        skid_logger.addHandler(cli_queue_handler)
         skid_logger.addHandler(log_handler)
-        palletjack_logger.addHandler(cli_handler)
+        palletjack_logger.addHandler(cli_queue_handler)
         palletjack_logger.addHandler(log_handler)
 
         #: Log any warnings at logging.WARNING
         #: Put after everything else to prevent creating a duplicate, default formatter
         #: (all log messages were duplicated if put at beginning)
-        logging.captureWarnings(True)
+        #: Only needs to happen once per process, not once per Skid
+        global _WARNINGS_CAPTURED
+        if not _WARNINGS_CAPTURED:
+            logging.captureWarnings(True)
+            _WARNINGS_CAPTURED = True
 
         skid_logger.debug("Creating Supervisor object")
         self.supervisor = Supervisor(handle_errors=True, logger=skid_logger, log_path=self.log_path)
@@ -116,22 +353,26 @@ class Skid:
             )
         )
 
-    def _remove_log_file_handlers(log_name, loggers):
-        """A helper function to remove the file handlers so the tempdir will close correctly
+    def _remove_log_file_handlers(self):
+        """A helper method to remove the file handlers so the tempdir will close correctly
 
-        Args:
-            log_name (str): The logfiles filename
-            loggers (List<str>): The loggers that are writing to log_name
+        Flushes any buffered records to the log file before closing it.
         """
 
-        for logger in loggers:
-            for handler in logger.handlers:
-                try:
-                    if log_name in handler.stream.name:
-                        logger.removeHandler(handler)
-                        handler.close()
-                except Exception:
-                    pass
+        #: Remove from every logger before closing, as the same handler is shared between loggers
+        file_handlers = {}
+        for logger in [self.skid_logger, self.palletjack_logger]:
+            for handler in logger.handlers[:]:
+                #: The file handler is wrapped in a MemoryHandler, so check its target
+                file_handler = getattr(handler, "target", handler)
+                if self.log_name in getattr(getattr(file_handler, "stream", None), "name", ""):
+                    logger.removeHandler(handler)
+                    file_handlers[handler] = file_handler
+
+        for handler, file_handler in file_handlers.items():
+            handler.flush()
+            handler.close()
+            file_handler.close()
 
     def process(self):
         """The main function that does all the work."""
@@ -139,9 +380,14 @@ class Skid:
         start = datetime.now()
 
         #: Get our GIS object via the ArcGIS API for Python
-        self.gis = arcgis.gis.GIS(config.AGOL_ORG, self.secrets.AGOL_USER, self.secrets.AGOL_PASSWORD)
+        self.gis = _get_gis(config.AGOL_ORG, self.secrets.AGOL_USER, self.secrets.AGOL_PASSWORD)
 
-        responses = self._extract_responses_from_agol()
+        try:
+            responses = self._extract_responses_from_agol()
+        except Exception:
+            #: Don't hold on to a possibly-stale session for the next run
+            _GIS_CACHE.pop((config.AGOL_ORG, self.secrets.AGOL_USER), None)
+            raise
 
         self.lhd_sheet_ids = {
             "BRHD": self.secrets.BRHD_SHEET_ID,
@@ -159,10 +405,20 @@ class Skid:
             "WMHD": self.secrets.WMHD_SHEET_ID,
         }
 
-        lhd_load_counts = []
-        for lhd_abbreviation in self.lhd_sheet_ids:
-            load_count = self._load_responses_to_sheet(responses, lhd_abbreviation)
-            lhd_load_counts.append(f"{lhd_abbreviation}: {load_count}")
+        #: Split the responses by LHD once instead of filtering the whole dataframe for each LHD
+        responses_by_lhd = dict(tuple(responses.groupby("Local Health District:")))
+        #: The loads are independent and network-bound, so run a few at a time
+        with ThreadPoolExecutor(max_workers=config.LHD_LOAD_WORKERS) as executor:
+            load_counts = executor.map(
+                lambda lhd_abbreviation: self._load_responses_to_sheet(
+                    responses_by_lhd.get(lhd_abbreviation, responses.iloc[0:0]), lhd_abbreviation
+                ),
+                self.lhd_sheet_ids,
+            )
+            lhd_load_counts = [
+                f"{lhd_abbreviation}: {load_count}"
+                for lhd_abbreviation, load_count in zip(self.lhd_sheet_ids, load_counts)
+            ]
 
         updated_contacts_df, contact_update_status = self.update_contacts_from_responses(responses)
         self.skid_logger.info(contact_update_status)
@@ -213,72 +469,73 @@ class Skid:
         summary_message.message = "\n".join(summary_rows)
         summary_message.attachments = self.tempdir_path / self.log_name
 
+        #: Write out any buffered log records so the attached log is complete
+        self.log_handler.flush()
+
         self.supervisor.notify(summary_message)
 
         #: Remove file handler so the tempdir will close properly
-        loggers = [logging.getLogger(config.SKID_NAME), logging.getLogger("palletjack")]
-        self._remove_log_file_handlers(loggers)
+        self._remove_log_file_handlers()
+
+    @functools.cached_property
+    def _gsheet_loader(self):
+        """A single GSheetLoader shared by the locations and contacts extracts so we only authorize once per run"""
+
+        return extract.GSheetLoader(self.secrets.GOOGLE_CREDENTIALS)
+
+    @staticmethod
+    def _ids_as_strings(ids: pd.Series) -> pd.Series:
+        """Make sure the ID column is all strings, skipping the copy if the sheet already gave us strings
+
+        Args:
+            ids (pd.Series): The ID# column from a sheet
+
+        Returns:
+            pd.Series: The IDs as strings
+        """
+
+        if pd.api.types.infer_dtype(ids, skipna=False) == "string":
+            return ids
+
+        return ids.astype(str)
+
+    @property
+    def _gsheets_client(self):
+        """An authorized pygsheets client for the current thread
+
+        The main thread reuses the GSheetLoader's client. pygsheets' underlying httplib2 connection isn't thread safe,
+        so each LHD loader thread authorizes (once) and keeps its own.
+        """
+
+        if threading.current_thread() is threading.main_thread():
+            return self._gsheet_loader.gsheets_client
+
+        if not hasattr(self._thread_gsheets_clients, "client"):
+            self._thread_gsheets_clients.client = utils.authorize_pygsheets(self.secrets.GOOGLE_CREDENTIALS)
+
+        return self._thread_gsheets_clients.client
 
     def _extract_locations_from_sheet(self):
-        gsheet_extractor = extract.GSheetLoader(self.secrets.GOOGLE_CREDENTIALS)
-        uocc_df = gsheet_extractor.load_specific_worksheet_into_dataframe(
+        uocc_df = self._gsheet_loader.load_specific_worksheet_into_dataframe(
             self.secrets.UOCC_LOCATIONS_SHEET_ID, "UOCCs", by_title=True
         )
-        uocc_df["ID#"] = uocc_df["ID#"].astype(str)
-
-        uocc_df.drop(
-            columns=[
-                "Local Health Department",
-                "UOCC Email Address",
-                "Corporate Email Address",
-                "Corporate Contact Name",
-                "UOCC Contact Name",
-            ],
-            inplace=True,
-        )
+        uocc_df["ID#"] = self._ids_as_strings(uocc_df["ID#"])
 
-        return uocc_df[uocc_df["Status"].str.lower() == "open"].copy()
+        #: Select the open rows and the columns we need in one go rather than dropping and then filtering
+        columns_to_keep = uocc_df.columns.difference(_LOCATION_COLUMNS_TO_DROP, sort=False)
+        open_locations = uocc_df["Status"].str.lower() == "open"
 
-    def _add_lhd_by_county(self, locations_df):
-        counties_to_lhd = {
-            "Box Elder": "BRHD",
-            "Cache": "BRHD",
-            "Rich": "BRHD",
-            "Weber": "WMHD",
-            "Morgan": "WMHD",
-            "Davis": "DCHD",
-            "Salt Lake": "SLCoHD",
-            "Utah": "UCHD",
-            "Wasatch": "WCHD",
-            "Summit": "SCHD",
-            "Juab": "CUHD",
-            "Millard": "CUHD",
-            "Piute": "CUHD",
-            "Sanpete": "CUHD",
-            "Sevier": "CUHD",
-            "Wayne": "CUHD",
-            "Tooele": "TCoHD",
-            "Beaver": "SWUHD",
-            "Iron": "SWUHD",
-            "Kane": "SWUHD",
-            "Washington": "SWUHD",
-            "Garfield": "SWUHD",
-            "San Juan": "SJHD",
-            "Grand": "SEUHD",
-            "Emery": "SEUHD",
-            "Carbon": "SEUHD",
-            "Duchesne": "TCHD",
-            "Daggett": "TCHD",
-            "Uintah": "TCHD",
-        }
+        return uocc_df.loc[open_locations, columns_to_keep]
 
-        locations_df["lhd"] = locations_df["County"].apply(lambda x: str(x).strip()).replace(counties_to_lhd)
+    def _add_lhd_by_county(self, locations_df):
+        counties = locations_df["County"].astype(str).str.strip()
+        locations_df["lhd"] = counties.map(_COUNTIES_TO_LHD).fillna(counties)
 
         return locations_df
 
     def _clean_field_names(self, df):
         #: Can't have newlines, spaces, or hashes in the column names for the S123 app to work
-        df.columns = [col.replace("\n", "").replace(" ", "").replace("#", "") for col in df.columns]
+        df.columns = df.columns.str.translate(_FIELD_NAME_DELETIONS)
 
         return df
 
@@ -286,16 +543,15 @@ class Skid:
         #: re https://support.esri.com/en-us/bug/an-error-occurs-when-trying-to-edit-an-arcgis-survey123-bug-000146547
         #: but the HTML entity code isn't working either, so just remove the apostrophes
 
-        df["FacilityName"] = df["FacilityName"].str.replace("'", "")
+        df["FacilityName"] = df["FacilityName"].str.replace("'", "", regex=False)
         return df
 
     def _extract_contacts_from_sheet(self):
-        gsheet_extractor = extract.GSheetLoader(self.secrets.GOOGLE_CREDENTIALS)
-        contacts_df = gsheet_extractor.load_specific_worksheet_into_dataframe(
+        contacts_df = self._gsheet_loader.load_specific_worksheet_into_dataframe(
             self.secrets.UOCC_CONTACTS_SHEET_ID, "UOCC Contacts", by_title=True
         )
 
-        contacts_df["ID#"] = contacts_df["ID#"].astype(str)
+        contacts_df["ID#"] = self._ids_as_strings(contacts_df["ID#"])
 
         return contacts_df
 
@@ -304,34 +560,49 @@ class Skid:
         survey_manager = arcgis.apps.survey123.SurveyManager(self.gis)
         survey_properties = survey_manager.get(self.secrets.SURVEY_ITEMID).properties
 
-        #: Download and extract the survey form
+        #: Download the survey form
         survey_item = self.gis.content.get(self.secrets.SURVEY_ITEMID)
         downloaded_zip = survey_item.download(save_path=self.tempdir.name)
 
-        with zipfile.ZipFile(downloaded_zip) as zipped_file:
-            zipped_file.extractall(self.tempdir_path / "_survey")
-
-        #: Overwrite the locations and contacts with the new data
-        locations_df.to_csv(self.tempdir_path / "_survey/esriinfo/media/locations_with_lhd.csv", index=False)
-        contacts_df.to_csv(self.tempdir_path / "_survey/esriinfo/media/uocc_contacts.csv", index=False)
+        #: Copy the survey form into a new zip, swapping in the new locations and contacts data. Built in a subfolder
+        #: because the downloaded zip may already have the title as its name.
+        new_media_csvs = {
+            "esriinfo/media/locations_with_lhd.csv": locations_df,
+            "esriinfo/media/uocc_contacts.csv": contacts_df,
+        }
+        new_zip = self.tempdir_path / "_survey" / f"{survey_properties['title']}.zip"
+        new_zip.parent.mkdir(exist_ok=True)
+        with (
+            zipfile.ZipFile(downloaded_zip) as old_zip,
+            zipfile.ZipFile(new_zip, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as rebuilt_zip,
+        ):
+            for info in old_zip.infolist():
+                if info.filename in new_media_csvs:
+                    continue
+                data = old_zip.read(info)
+                #: Don't spend time deflating media that's already compressed. The copied ZipInfo doesn't carry the
+                #: archive's compresslevel, so pass it explicitly rather than falling back to zlib's default.
+                if Path(info.filename).suffix.lower() in _PRECOMPRESSED_SUFFIXES:
+                    compress_type = zipfile.ZIP_STORED
+                else:
+                    compress_type = zipfile.ZIP_DEFLATED
+                rebuilt_zip.writestr(info, data, compress_type=compress_type, compresslevel=1)
+            for csv_name, dataframe in new_media_csvs.items():
+                rebuilt_zip.writestr(csv_name, dataframe.to_csv(index=False))
 
         #: Remove old zip file to avoid conflicts
         Path(downloaded_zip).unlink()
 
-        #: Re-zip the survey form with the new data, update the AGOL item
-        new_zip_name = survey_properties["title"]
-        new_zip = shutil.make_archive(self.tempdir_path / new_zip_name, "zip", self.tempdir_path / "_survey")
-
-        update_success = survey_item.update({}, new_zip)
+        #: Update the AGOL item with the new survey form
+        update_success = survey_item.update({}, str(new_zip))
 
         return update_success
 
     def _extract_responses_from_agol(self):
-        #: Download from AGOL
         feature_layer = self.gis.content.get(self.secrets.RESULTS_ITEMID).layers[0]
-        responses = feature_layer.query(return_geometry=False, as_df=True)
+        fields = feature_layer.properties.fields
 
-        #: Drop unneeded columns
+        #: Download from AGOL, only asking for the columns we need
         columns_to_drop = [
             "objectid",
             "password_entry",
@@ -342,76 +613,100 @@ class Skid:
             "EditDate",
             "Editor",
         ]
+        out_fields = [field["name"] for field in fields if field["name"] not in columns_to_drop]
+        responses = feature_layer.query(out_fields=",".join(out_fields), return_geometry=False, as_df=True)
+
+        #: AGOL can still include the object id even when it isn't requested
         responses.drop(columns=columns_to_drop, errors="ignore", inplace=True)
 
         #: Rename columns to match the aliases in the survey, including numbering
-        alias_mapper = {field["name"]: field["alias"] for field in feature_layer.properties.fields}
+        alias_mapper = {field["name"]: field["alias"] for field in fields}
         new_column_names = self._map_aliases_to_columns(alias_mapper)
 
         return responses.rename(columns=new_column_names)
 
     @staticmethod
     def _map_aliases_to_columns(alias_mapper_dict):
-        number_regex = re.compile(r"\d{1,2}\. ")
-        sub_number_regex = re.compile(r"\d{1,2}[a-z]{1}\. ")
-
         current = ""
         end_field = "assistance"
+        new_mapping = dict(alias_mapper_dict)
         for field, alias in alias_mapper_dict.items():
             if field == end_field:
                 break
-            if number_regex.search(alias):
-                current = number_regex.search(alias).group(0)
+            number_match = _QUESTION_NUMBER_REGEX.search(alias)
+            if number_match:
+                current = number_match.group(0)
                 continue
-            if sub_number_regex.search(alias):
+            if _SUB_QUESTION_NUMBER_REGEX.search(alias):
                 continue
             if current:
-                new_alias = current + alias
-                alias_mapper_dict[field] = new_alias
+                new_mapping[field] = current + alias
                 continue
 
-        return alias_mapper_dict
+        return new_mapping
 
-    def _load_responses_to_sheet(self, responses, lhd_abbreviation):
+    def _load_responses_to_sheet(self, lhd_responses, lhd_abbreviation):
         """Load the responses to the Google Sheet
 
         Args:
-            responses (pd.DataFrame): The DataFrame containing the responses to load
+            lhd_responses (pd.DataFrame): The responses for this local health department
             lhd_abbreviation (str): The abbreviation for the local health department
         """
 
+        #: Nothing could be new, so don't bother reading the sheet
+        if lhd_responses.empty:
+            self.skid_logger.debug("No responses for %s, skipping its sheet", lhd_abbreviation)
+            return 0
+
         self.skid_logger.debug(
             "Loading responses to the %s sheet with id %s", lhd_abbreviation, self.lhd_sheet_ids[lhd_abbreviation]
         )
-        gsheets_client = utils.authorize_pygsheets(self.secrets.GOOGLE_CREDENTIALS)
-        lhd_spreadsheet = gsheets_client.open_by_key(self.lhd_sheet_ids[lhd_abbreviation])
+        lhd_spreadsheet = self._gsheets_client.open_by_key(self.lhd_sheet_ids[lhd_abbreviation])
         
-        # Iterate through all worksheets and combine their data
+        #: Only pull the GlobalID column from each worksheet rather than the whole sheet, batching the header and column
+        #: reads for all the worksheets into one request each
         all_worksheets = lhd_spreadsheet.worksheets()
         self.skid_logger.debug("Found %s worksheets in the %s sheet", len(all_worksheets), lhd_abbreviation)
-        
-        dataframes = []
-        for idx, worksheet in enumerate(all_worksheets):
-            self.skid_logger.debug("Reading worksheet %s of %s: %s", idx + 1, len(all_worksheets), worksheet.title)
-            df = worksheet.get_as_df()
-            if not df.empty:
-                dataframes.append(df)
-        
-        # Combine all DataFrames into one
-        if dataframes:
-            live_dataframe = pd.concat(dataframes, ignore_index=True)
-        else:
-            live_dataframe = pd.DataFrame(columns=["GlobalID"])
-        
-        lhd_dataframe = responses[responses["Local Health District:"] == lhd_abbreviation].copy()
-        adds = lhd_dataframe[~lhd_dataframe["GlobalID"].isin(live_dataframe["GlobalID"])]
+
+        header_ranges = self._gsheets_client.sheet.values_batch_get(
+            lhd_spreadsheet.id, [_worksheet_range(worksheet.title) for worksheet in all_worksheets]
+        )
+        global_id_columns = {}
+        for idx, (worksheet, header_range) in enumerate(zip(all_worksheets, header_ranges)):
+            header = header_range.get("values", [[]])[0]
+            if "GlobalID" not in header:
+                self.skid_logger.debug("Skipping worksheet %s without GlobalIDs: %s", idx + 1, worksheet.title)
+                continue
+            global_id_columns[idx] = _worksheet_range(worksheet.title, header.index("GlobalID") + 1)
+
+        existing_global_ids = set()
+        first_worksheet_rows = 0
+        if global_id_columns:
+            global_id_ranges = self._gsheets_client.sheet.values_batch_get(
+                lhd_spreadsheet.id, list(global_id_columns.values()), major_dimension="COLUMNS"
+            )
+            for idx, global_id_range in zip(global_id_columns, global_id_ranges):
+                global_ids = global_id_range.get("values", [[]])[0]
+                existing_global_ids.update(global_ids[1:])
+                if idx == 0:
+                    first_worksheet_rows = len(global_ids)
+
+        adds = lhd_responses[~lhd_responses["GlobalID"].isin(existing_global_ids)]
         if not adds.empty:
             # Write to the first worksheet (index 0) for backward compatibility
             first_worksheet = lhd_spreadsheet.worksheet("index", 0)
-            # Get the first worksheet's data directly to determine where to append new rows
-            first_worksheet_df = first_worksheet.get_as_df()
+            # The GlobalID column ends at the last row we wrote. Hand-entered rows without a GlobalID can only be below
+            # that, so just read those rows (the API leaves off trailing empty rows) to make sure they don't get
+            # overwritten. Row 1 is always kept for the header, even on an empty sheet.
+            first_worksheet_rows = max(first_worksheet_rows, 1)
+            if first_worksheet_rows < first_worksheet.rows:
+                rows_below = self._gsheets_client.sheet.values_batch_get(
+                    lhd_spreadsheet.id,
+                    [_worksheet_rows_range(first_worksheet.title, first_worksheet_rows + 1, first_worksheet.cols)],
+                )[0]
+                first_worksheet_rows += len(rows_below.get("values", []))
             first_worksheet.set_dataframe(
-                adds, (first_worksheet_df.shape[0] + 2, 1), copy_index=False, copy_head=False, extend=True, nan=""
+                adds, (first_worksheet_rows + 1, 1), copy_index=False, copy_head=False, extend=True, nan=""
             )
 
             add_count = adds.shape[0]
@@ -453,11 +748,26 @@ class Skid:
         new_contact_info = responses[responses["Is this information still correct?"] == "no"][
             ["UOCC Facility Code:", "UOCC Manager or Contact Name:", "UOCC Email Address:", "date_of_signature"]
         ].copy()
-        new_contact_info.sort_values(by=["date_of_signature"], ascending=False, inplace=True)
-        new_contact_info.drop_duplicates(subset=["UOCC Facility Code:"], keep="first", inplace=True)
-        new_contact_info.drop(columns=["date_of_signature"], inplace=True)
 
-        return new_contact_info
+        #: Take the latest signature per facility with a single grouped idxmax rather than sorting everything. Facilities
+        #: without any signature dates have no max, so just keep their first update. Missing facility codes are kept as
+        #: their own group, like drop_duplicates would.
+        facility_codes = new_contact_info["UOCC Facility Code:"]
+        has_date = new_contact_info["date_of_signature"].notna()
+        latest_dated_rows = (
+            new_contact_info[has_date]
+            .groupby("UOCC Facility Code:", dropna=False)["date_of_signature"]
+            .idxmax()
+            .tolist()
+        )
+        undated_rows = facility_codes[~has_date & ~facility_codes.isin(facility_codes[has_date])].drop_duplicates()
+
+        #: Only the kept rows get sorted, latest signature first (undated last) as before
+        return (
+            new_contact_info.loc[latest_dated_rows + undated_rows.index.tolist()]
+            .sort_values(by=["date_of_signature"], ascending=False, kind="stable")
+            .drop(columns=["date_of_signature"])
+        )
 
     def _clean_contacts_dataframe(self, new_contacts: pd.DataFrame) -> pd.DataFrame:
         """Align new contacts dataframe for a df.update
@@ -474,13 +784,8 @@ class Skid:
             "UOCC Manager or Contact Name:": "UOCC Contact Name",
             "UOCC Email Address:": "UOCC Email Address",
         }
-        new_contacts.rename(columns=survey_to_live_mapping, inplace=True)
-        for column in new_contacts.columns:
-            new_contacts[column] = new_contacts[column].astype("object")
-
-        new_contacts.set_index("ID#", inplace=True)
-
-        return new_contacts
+        #: One astype for the whole frame instead of rebuilding each column separately
+        return new_contacts.rename(columns=survey_to_live_mapping).astype("object").set_index("ID#")
 
     def _update_existing_contacts_dataframe(
         self, live_contacts: pd.DataFrame, new_contacts: pd.DataFrame
@@ -495,18 +800,12 @@ class Skid:
             pd.DataFrame: The updated contacts dataframe
         """
 
-        #: get so we can return the ID column to the right place after the reindex
-        id_column_index = live_contacts.columns.get_loc("ID#")
-
-        live_contacts.set_index("ID#", inplace=True)
-        live_contacts.update(new_contacts)
-
-        live_contacts.reset_index(inplace=True)
-
-        #: Reshuffle ID column back to original location
-        cols = live_contacts.columns.tolist()
-        cols.insert(id_column_index, cols.pop(cols.index("ID#")))
-        live_contacts = live_contacts.reindex(columns=cols)
+        #: Overwrite matching cells in place (like df.update, only non-null new values win) so we don't have to move
+        #: the ID column into the index and shuffle it back afterwards
+        for column in [column for column in new_contacts.columns if column in live_contacts.columns]:
+            new_values = live_contacts["ID#"].map(new_contacts[column])
+            has_new_value = new_values.notna()
+            live_contacts.loc[has_new_value, column] = new_values[has_new_value]
 
         return live_contacts
 
@@ -520,8 +819,7 @@ class Skid:
         self.skid_logger.debug(
             "Loading updated contacts to the contacts sheet with id %s", self.secrets.UOCC_CONTACTS_SHEET_ID
         )
-        gsheets_client = utils.authorize_pygsheets(self.secrets.GOOGLE_CREDENTIALS)
-        contacts_worksheet = gsheets_client.open_by_key(self.secrets.UOCC_CONTACTS_SHEET_ID).worksheet(
+        contacts_worksheet = self._gsheets_client.open_by_key(self.secrets.UOCC_CONTACTS_SHEET_ID).worksheet(
             "title", "UOCC Contacts"
         )
         contacts_worksheet.set_dataframe(
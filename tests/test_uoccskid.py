@@ -1,12 +1,28 @@
+import logging
+import logging.handlers
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import pytest
 
 from uocc import main
 
 
+@pytest.fixture(autouse=True)
+def clear_secrets_caches():
+    main._load_secrets_file.cache_clear()
+    main._get_google_credentials.cache_clear()
+    yield
+    main._load_secrets_file.cache_clear()
+    main._get_google_credentials.cache_clear()
+
+
 def test_get_secrets_from_gcp_location(mocker):
     mocker.patch("pathlib.Path.exists", return_value=True)
-    mocker.patch("pathlib.Path.read_text", return_value='{"foo":"bar"}')
+    mocker.patch("pathlib.Path.read_bytes", return_value=b'{"foo":"bar"}')
     mocker.patch("google.auth.default", return_value=("sa", 42))
 
     secrets = main.Skid._get_secrets()
@@ -16,7 +32,7 @@ def test_get_secrets_from_gcp_location(mocker):
 
 def test_get_secrets_from_local_location(mocker):
     mocker.patch("pathlib.Path.exists", return_value=False)
-    mocker.patch("pathlib.Path.read_text", return_value='{"foo":"bar"}')
+    mocker.patch("pathlib.Path.read_bytes", return_value=b'{"foo":"bar"}')
     mocker.patch("google.auth.default", return_value=("local_adc", 42))
 
     secrets = main.Skid._get_secrets()
@@ -26,13 +42,159 @@ def test_get_secrets_from_local_location(mocker):
 
 def test_get_secrets_raises_if_no_secrets(mocker):
     mocker.patch("pathlib.Path.exists", return_value=False)
-    mocker.patch("pathlib.Path.read_text", side_effect=FileNotFoundError)
+    mocker.patch("pathlib.Path.read_bytes", side_effect=FileNotFoundError)
 
     with pytest.raises(RuntimeError) as excinfo:
         main.Skid._get_secrets()
         assert "Secrets folder not found; secrets not loaded." in str(excinfo.value)
 
 
+def test_get_secrets_reuses_cached_file_and_credentials(mocker):
+    mocker.patch("pathlib.Path.exists", return_value=True)
+    read_bytes_mock = mocker.patch("pathlib.Path.read_bytes", return_value=b'{"foo":"bar"}')
+    auth_mock = mocker.patch("google.auth.default", return_value=("sa", 42))
+
+    first = main.Skid._get_secrets()
+    first["foo"] = "modified"
+    second = main.Skid._get_secrets()
+
+    assert second == {"foo": "bar", "GOOGLE_CREDENTIALS": "sa"}
+    read_bytes_mock.assert_called_once()
+    auth_mock.assert_called_once()
+
+
+def test_config_resolves_host_name_lazily_and_only_once(mocker):
+    main.config._resolve_host_name.cache_clear()
+    main.config._sendgrid_settings.cache_clear()
+    urlopen_mock = mocker.patch("urllib.request.urlopen", side_effect=OSError)
+    mocker.patch("socket.gethostname", return_value="local-host")
+
+    try:
+        assert main.config.HOST_NAME == "local-host"
+        assert main.config.SENDGRID_SETTINGS["prefix"] == "uocc-skid on local-host: "
+        assert main.config.SENDGRID_SETTINGS is main.config.SENDGRID_SETTINGS
+        urlopen_mock.assert_called_once()
+    finally:
+        main.config._resolve_host_name.cache_clear()
+        main.config._sendgrid_settings.cache_clear()
+
+
+def test_get_gis_reuses_gis_for_same_org_and_user(mocker):
+    gis_mock = mocker.patch("uocc.main.arcgis.gis.GIS")
+    mocker.patch.dict("uocc.main._GIS_CACHE", clear=True)
+
+    first = main._get_gis("org", "user", "password")
+    second = main._get_gis("org", "user", "password")
+    other = main._get_gis("org", "other_user", "password")
+
+    assert first is second
+    assert gis_mock.call_count == 2
+    assert other is gis_mock.return_value
+
+
+def test_remove_log_file_handlers_flushes_and_removes_only_file_handlers(mocker, tmp_path):
+    skid_logger = logging.getLogger(main.config.SKID_NAME)
+    palletjack_logger = logging.getLogger("palletjack")
+    file_handler = logging.FileHandler(tmp_path / "log_foo.txt", mode="w")
+    memory_handler = logging.handlers.MemoryHandler(capacity=1024, target=file_handler)
+    stream_handler = logging.StreamHandler()
+    for logger in [skid_logger, palletjack_logger]:
+        logger.addHandler(memory_handler)
+        logger.addHandler(stream_handler)
+
+    skid_mock = mocker.Mock()
+    skid_mock.log_name = "log_foo.txt"
+    skid_mock.skid_logger = skid_logger
+    skid_mock.palletjack_logger = palletjack_logger
+
+    try:
+        skid_logger.error("buffered message")
+        skid_logger.warning("another buffered message")
+
+        main.Skid._remove_log_file_handlers(skid_mock)
+
+        assert memory_handler not in skid_logger.handlers
+        assert memory_handler not in palletjack_logger.handlers
+        assert stream_handler in skid_logger.handlers
+        assert stream_handler in palletjack_logger.handlers
+        assert "another buffered message" in (tmp_path / "log_foo.txt").read_text()
+    finally:
+        for logger in [skid_logger, palletjack_logger]:
+            logger.removeHandler(memory_handler)
+            logger.removeHandler(stream_handler)
+
+
+def test_initialize_supervisor_replaces_handlers_from_earlier_skids(mocker, tmp_path):
+    mocker.patch("uocc.main.Supervisor")
+    mocker.patch("uocc.main.SendGridHandler")
+    mocker.patch("uocc.main.config._resolve_host_name", return_value="test-host")
+    mocker.patch.dict("uocc.main.config.SENDGRID_SETTINGS")
+    skid_logger = logging.getLogger(main.config.SKID_NAME)
+    palletjack_logger = logging.getLogger("palletjack")
+
+    skids = []
+    file_handlers = []
+    listeners = []
+    try:
+        for run in range(2):
+            skid = main.Skid.__new__(main.Skid)
+            skid.secrets = mocker.Mock()
+            skid.tempdir = mocker.Mock()
+            skid.log_path = tmp_path / f"log_{run}.txt"
+            skid._initialize_supervisor()
+            skids.append(skid)
+            file_handlers.append(skid.log_handler.target)
+            listeners.append(main._LOG_LISTENER)
+            skid.skid_logger.info("message from run %s", run)
+
+        assert len(skid_logger.handlers) == 2
+        assert len(palletjack_logger.handlers) == 2
+        assert skids[1].log_handler in skid_logger.handlers
+        assert skids[0].log_handler not in skid_logger.handlers
+
+        #: The first skid's log file was flushed and closed and its listener thread stopped
+        assert file_handlers[0].stream is None
+        assert "message from run 0" in (tmp_path / "log_0.txt").read_text()
+        assert file_handlers[1].stream is not None
+        assert listeners[0]._thread is None
+        assert main._LOG_LISTENER is listeners[1]
+        assert listeners[1]._thread.is_alive()
+    finally:
+        main._stop_log_listener()
+        for logger in [skid_logger, palletjack_logger]:
+            for handler in logger.handlers[:]:
+                logger.removeHandler(handler)
+                handler.close()
+        for file_handler in file_handlers:
+            file_handler.close()
+
+
+def test_stdout_logging_still_works_after_file_handlers_are_removed(mocker, tmp_path, capsys):
+    mocker.patch("uocc.main.Supervisor")
+    mocker.patch("uocc.main.SendGridHandler")
+    mocker.patch("uocc.main.config._resolve_host_name", return_value="test-host")
+    mocker.patch.dict("uocc.main.config.SENDGRID_SETTINGS")
+    skid = main.Skid.__new__(main.Skid)
+    skid.secrets = mocker.Mock()
+    skid.tempdir = mocker.Mock()
+    skid.log_path = tmp_path / "log.txt"
+    skid.log_name = "log.txt"
+
+    try:
+        skid._initialize_supervisor()
+        skid._remove_log_file_handlers()
+        skid.skid_logger.error("logged after process")
+        main._stop_log_listener()
+
+        assert "logged after process" in capsys.readouterr().out
+    finally:
+        main._stop_log_listener()
+        for logger in [skid.skid_logger, skid.palletjack_logger]:
+            for handler in logger.handlers[:]:
+                logger.removeHandler(handler)
+                handler.close()
+
+
 class TestLocationsExtracting:
     def test_extract_locations_from_sheet_only_returns_opens(self, mocker):
         input_dataframe = pd.DataFrame(
@@ -47,10 +209,11 @@ class TestLocationsExtracting:
             }
         )
 
-        GSheetLoader_mock = mocker.patch("uocc.main.extract.GSheetLoader")
-        GSheetLoader_mock.return_value.load_specific_worksheet_into_dataframe.return_value = input_dataframe
+        skid_mock = mocker.Mock()
+        skid_mock._gsheet_loader.load_specific_worksheet_into_dataframe.return_value = input_dataframe
+        skid_mock._ids_as_strings.side_effect = main.Skid._ids_as_strings
 
-        output_dataframe = main.Skid._extract_locations_from_sheet(mocker.Mock())
+        output_dataframe = main.Skid._extract_locations_from_sheet(skid_mock)
 
         expected_dataframe = pd.DataFrame(
             {
@@ -62,6 +225,38 @@ class TestLocationsExtracting:
 
         pd.testing.assert_frame_equal(expected_dataframe, output_dataframe)
 
+    def test_ids_as_strings_returns_string_column_unchanged(self):
+        ids = pd.Series(["UOCC-1234", "UOCC-5678"])
+
+        output = main.Skid._ids_as_strings(ids)
+
+        assert output is ids
+
+    def test_ids_as_strings_converts_mixed_values(self):
+        ids = pd.Series(["UOCC-1234", 5678], dtype=object)
+
+        output = main.Skid._ids_as_strings(ids)
+
+        pd.testing.assert_series_equal(pd.Series(["UOCC-1234", "5678"]), output)
+
+    def test_add_lhd_by_county_strips_and_maps_counties(self, mocker):
+        input_dataframe = pd.DataFrame(
+            {
+                "County": ["Salt Lake ", " Cache", "Nowhere"],
+            }
+        )
+
+        output_dataframe = main.Skid._add_lhd_by_county(mocker.Mock(), input_dataframe)
+
+        expected_dataframe = pd.DataFrame(
+            {
+                "County": ["Salt Lake ", " Cache", "Nowhere"],
+                "lhd": ["SLCoHD", "BRHD", "Nowhere"],
+            }
+        )
+
+        pd.testing.assert_frame_equal(expected_dataframe, output_dataframe)
+
     def test_clean_location_field_names_removes_newlines_spaces_hashes(self, mocker):
         input_dataframe = pd.DataFrame(
             {
@@ -103,6 +298,148 @@ class TestLocationsExtracting:
         pd.testing.assert_frame_equal(expected_dataframe, output_dataframe)
 
 
+class TestGoogleSheetsClients:
+    def test_gsheet_loader_is_only_created_once(self, mocker):
+        GSheetLoader_mock = mocker.patch("uocc.main.extract.GSheetLoader")
+        skid = main.Skid.__new__(main.Skid)
+        skid.secrets = mocker.Mock()
+        skid.tempdir = mocker.Mock()
+
+        first_loader = skid._gsheet_loader
+        second_loader = skid._gsheet_loader
+
+        assert first_loader is second_loader
+        GSheetLoader_mock.assert_called_once_with(skid.secrets.GOOGLE_CREDENTIALS)
+
+    def test_gsheets_client_reuses_gsheet_loader_client(self, mocker):
+        GSheetLoader_mock = mocker.patch("uocc.main.extract.GSheetLoader")
+        authorize_mock = mocker.patch("palletjack.utils.authorize_pygsheets")
+        skid = main.Skid.__new__(main.Skid)
+        skid.secrets = mocker.Mock()
+        skid.tempdir = mocker.Mock()
+
+        assert skid._gsheets_client is GSheetLoader_mock.return_value.gsheets_client
+        authorize_mock.assert_not_called()
+
+    def test_gsheets_client_authorizes_separate_client_per_worker_thread(self, mocker):
+        GSheetLoader_mock = mocker.patch("uocc.main.extract.GSheetLoader")
+        authorize_mock = mocker.patch("palletjack.utils.authorize_pygsheets", side_effect=lambda _: object())
+        skid = main.Skid.__new__(main.Skid)
+        skid.secrets = mocker.Mock()
+        skid.tempdir = mocker.Mock()
+        skid._thread_gsheets_clients = threading.local()
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            first, second = executor.map(lambda _: skid._gsheets_client, range(2))
+
+        assert first is second
+        assert first is not GSheetLoader_mock.return_value.gsheets_client
+        authorize_mock.assert_called_once_with(skid.secrets.GOOGLE_CREDENTIALS)
+
+
+class TestSurveyMediaFolder:
+    def test_update_items_in_survey_media_folder_replaces_csvs_and_keeps_other_files(self, mocker, tmp_path):
+        downloaded_zip = tmp_path / "UOCC Inspection.zip"
+        with zipfile.ZipFile(downloaded_zip, "w") as survey_zip:
+            survey_zip.writestr("esriinfo/form.xlsx", "form contents")
+            survey_zip.writestr("esriinfo/media/logo.png", "png contents", compress_type=zipfile.ZIP_DEFLATED)
+            survey_zip.writestr("esriinfo/media/locations_with_lhd.csv", "old,locations")
+            survey_zip.writestr("esriinfo/media/uocc_contacts.csv", "old,contacts")
+
+        mocker.patch("arcgis.apps.survey123.SurveyManager").return_value.get.return_value.properties = {
+            "title": "UOCC Inspection"
+        }
+        skid_mock = mocker.Mock()
+        skid_mock.tempdir.name = str(tmp_path)
+        skid_mock.tempdir_path = tmp_path
+        survey_item = skid_mock.gis.content.get.return_value
+        survey_item.download.return_value = str(downloaded_zip)
+
+        uploaded = {}
+        compress_types = {}
+
+        def _capture_upload(item_properties, data):
+            with zipfile.ZipFile(data) as uploaded_zip:
+                uploaded.update({name: uploaded_zip.read(name).decode() for name in uploaded_zip.namelist()})
+                compress_types.update({info.filename: info.compress_type for info in uploaded_zip.infolist()})
+            return True
+
+        survey_item.update.side_effect = _capture_upload
+
+        locations_df = pd.DataFrame({"ID": ["UOCC-1234"], "FacilityName": ["Autozone"]})
+        contacts_df = pd.DataFrame({"ID": ["UOCC-1234"], "UOCCContactName": ["Alice"]})
+
+        update_success = main.Skid._update_items_in_survey_media_folder(skid_mock, locations_df, contacts_df)
+
+        assert update_success is True
+        assert not downloaded_zip.exists()
+        assert survey_item.update.call_args[0][1].endswith("UOCC Inspection.zip")
+        assert uploaded["esriinfo/form.xlsx"] == "form contents"
+        assert uploaded["esriinfo/media/locations_with_lhd.csv"] == locations_df.to_csv(index=False)
+        assert uploaded["esriinfo/media/uocc_contacts.csv"] == contacts_df.to_csv(index=False)
+        assert uploaded["esriinfo/media/logo.png"] == "png contents"
+        assert len(uploaded) == 4
+        assert compress_types["esriinfo/media/logo.png"] == zipfile.ZIP_STORED
+        assert compress_types["esriinfo/media/locations_with_lhd.csv"] == zipfile.ZIP_DEFLATED
+
+    def test_update_items_in_survey_media_folder_deflates_copied_entries_at_level_1(self, mocker, tmp_path):
+        #: Compressible but not trivially so, so levels 1 and 6 give different sizes
+        text_contents = " ".join(str(i * 7919 % 10007) for i in range(20000)).encode()
+        downloaded_zip = tmp_path / "UOCC Inspection.zip"
+        with zipfile.ZipFile(downloaded_zip, "w", zipfile.ZIP_DEFLATED) as survey_zip:
+            survey_zip.writestr("esriinfo/form.webform", text_contents)
+            survey_zip.writestr("esriinfo/form.xlsx", text_contents)
+
+        mocker.patch("arcgis.apps.survey123.SurveyManager").return_value.get.return_value.properties = {
+            "title": "UOCC Inspection"
+        }
+        skid_mock = mocker.Mock()
+        skid_mock.tempdir.name = str(tmp_path)
+        skid_mock.tempdir_path = tmp_path
+        survey_item = skid_mock.gis.content.get.return_value
+        survey_item.download.return_value = str(downloaded_zip)
+
+        infos = {}
+
+        def _capture_upload(item_properties, data):
+            with zipfile.ZipFile(data) as uploaded_zip:
+                infos.update({info.filename: info for info in uploaded_zip.infolist()})
+            return True
+
+        survey_item.update.side_effect = _capture_upload
+
+        main.Skid._update_items_in_survey_media_folder(skid_mock, pd.DataFrame(), pd.DataFrame())
+
+        level_1 = zlib.compressobj(1, zlib.DEFLATED, -zlib.MAX_WBITS)
+        level_1_size = len(level_1.compress(text_contents) + level_1.flush())
+        assert infos["esriinfo/form.webform"].compress_type == zipfile.ZIP_DEFLATED
+        assert infos["esriinfo/form.webform"].compress_size == level_1_size
+        assert infos["esriinfo/form.xlsx"].compress_type == zipfile.ZIP_STORED
+
+
+class TestResponsesExtracting:
+    def test_extract_responses_from_agol_only_requests_needed_fields(self, mocker):
+        feature_layer = mocker.Mock()
+        feature_layer.properties.fields = [
+            {"name": "objectid", "alias": "ObjectID"},
+            {"name": "foo", "alias": "1. First Question"},
+            {"name": "logo", "alias": "Logo"},
+            {"name": "bar", "alias": "Comments"},
+        ]
+        feature_layer.query.return_value = pd.DataFrame({"objectid": [1], "foo": ["yes"], "bar": ["none"]})
+        skid_mock = mocker.Mock()
+        skid_mock.gis.content.get.return_value.layers = [feature_layer]
+        skid_mock._map_aliases_to_columns.side_effect = main.Skid._map_aliases_to_columns
+
+        responses = main.Skid._extract_responses_from_agol(skid_mock)
+
+        feature_layer.query.assert_called_once_with(out_fields="foo,bar", return_geometry=False, as_df=True)
+        pd.testing.assert_frame_equal(
+            pd.DataFrame({"1. First Question": ["yes"], "1. Comments": ["none"]}),
+            responses,
+        )
+
+
 class TestQuestionsRenaming:
     def test_map_aliases_to_columns_assigns_numbers_to_sub_fields(self):
         input_mapping = {
@@ -236,6 +573,56 @@ class TestContactUpdating:
 
         pd.testing.assert_frame_equal(expected_output, output)
 
+    def test_extract_contact_updates_from_responses_keeps_updates_without_dates(self, mocker):
+        responses = pd.DataFrame(
+            {
+                "UOCC Facility Code:": ["UOCC-1234", "UOCC-5678", "UOCC-5678", "UOCC-1234"],
+                "UOCC Manager or Contact Name:": ["Alice", "Bob", "Charlie", "David"],
+                "UOCC Email Address:": ["foo@bar.com", "bar@baz.com", "baz@bar.com", "qux@bar.com"],
+                "date_of_signature": [None, None, None, "2023-01-01"],
+                "Is this information still correct?": ["no", "no", "no", "no"],
+            }
+        )
+        responses["date_of_signature"] = responses["date_of_signature"].astype("datetime64[ns]")
+
+        expected_output = pd.DataFrame(
+            {
+                "UOCC Facility Code:": ["UOCC-1234", "UOCC-5678"],
+                "UOCC Manager or Contact Name:": ["David", "Bob"],
+                "UOCC Email Address:": ["qux@bar.com", "bar@baz.com"],
+            },
+            index=[3, 1],
+        )
+
+        output = main.Skid._extract_contact_updates_from_responses(mocker.Mock, responses)
+
+        pd.testing.assert_frame_equal(expected_output, output)
+
+    def test_extract_contact_updates_from_responses_keeps_latest_update_without_facility_code(self, mocker):
+        responses = pd.DataFrame(
+            {
+                "UOCC Facility Code:": [None, "UOCC-1234", None, "UOCC-1234"],
+                "UOCC Manager or Contact Name:": ["Alice", "Bob", "Charlie", "David"],
+                "UOCC Email Address:": ["foo@bar.com", "bar@baz.com", "baz@bar.com", "qux@bar.com"],
+                "date_of_signature": ["2023-01-01", "2023-01-02", "2023-01-04", "2023-01-03"],
+                "Is this information still correct?": ["no", "no", "no", "no"],
+            }
+        )
+        responses["date_of_signature"] = responses["date_of_signature"].astype("datetime64[ns]")
+
+        expected_output = pd.DataFrame(
+            {
+                "UOCC Facility Code:": [None, "UOCC-1234"],
+                "UOCC Manager or Contact Name:": ["Charlie", "David"],
+                "UOCC Email Address:": ["baz@bar.com", "qux@bar.com"],
+            },
+            index=[2, 3],
+        )
+
+        output = main.Skid._extract_contact_updates_from_responses(mocker.Mock, responses)
+
+        pd.testing.assert_frame_equal(expected_output, output)
+
     def test_extract_contact_updates_returns_empty_dataframe_if_no_updates(self, mocker):
         responses = pd.DataFrame(
             {
@@ -273,9 +660,7 @@ class TestContactUpdating:
                 "UOCC Email Address:": ["foo@bar.com", "bar@baz.com"],
             }
         )
-        new_contacts["UOCC Facility Code:"] = new_contacts["UOCC Facility Code:"].astype("string")
-        new_contacts["UOCC Manager or Contact Name:"] = new_contacts["UOCC Manager or Contact Name:"].astype("string")
-        new_contacts["UOCC Email Address:"] = new_contacts["UOCC Email Address:"].astype("string")
+        new_contacts = new_contacts.astype("string")
 
         expected_output = pd.DataFrame(
             {
@@ -470,51 +855,103 @@ class TestContactUpdating:
         skid_mock.skid_logger.error.assert_called_once()
 
 
+def _mock_worksheet(mocker, title, dataframe):
+    """Mock a pygsheets worksheet whose dataframe and batchGet ranges (header row, whole columns) come from dataframe"""
+
+    def _trimmed(values):
+        #: Like the Sheets API, leave off trailing empty values
+        while values and values[-1] in ("", []):
+            values = values[:-1]
+        return values
+
+    def _value_range(values):
+        #: ...and empty ranges come back without any values
+        return {"values": values} if values else {}
+
+    worksheet = mocker.Mock()
+    worksheet.title = title
+    worksheet.rows = 1000
+    worksheet.cols = 26
+    header = list(dataframe.columns)
+    rows = [_trimmed(row) for row in [header, *dataframe.values.tolist()]]
+    worksheet.values_by_range = {main._worksheet_range(title): _value_range(_trimmed([header]))}
+    for first_row in range(1, len(rows) + 2):
+        worksheet.values_by_range[main._worksheet_rows_range(title, first_row, worksheet.cols)] = _value_range(
+            _trimmed(rows[first_row - 1 :])
+        )
+    for column_number, column in enumerate(header, start=1):
+        worksheet.values_by_range[main._worksheet_range(title, column_number)] = _value_range(
+            [_trimmed([column, *dataframe[column].tolist()])]
+        )
+
+    return worksheet
+
+
+def _mock_values_batch_get(skid_instance, *worksheets):
+    """Serve the skid's batchGet requests from the mocked worksheets' ranges"""
+
+    values_by_range = {}
+    for worksheet in worksheets:
+        values_by_range.update(worksheet.values_by_range)
+
+    batch_get = skid_instance._gsheets_client.sheet.values_batch_get
+    batch_get.side_effect = lambda spreadsheet_id, value_ranges, **kwargs: [values_by_range[r] for r in value_ranges]
+
+    return batch_get
+
+
+class TestWorksheetRange:
+    def test_worksheet_range_quotes_titles_for_header_row(self):
+        assert main._worksheet_range("Bob's 2024 Sheet") == "'Bob''s 2024 Sheet'!1:1"
+
+    def test_quote_worksheet_title_escapes_apostrophes(self):
+        assert main._quote_worksheet_title("Bob's 2024 Sheet") == "'Bob''s 2024 Sheet'"
+
+    def test_worksheet_rows_range_spans_every_column_from_first_row(self):
+        assert main._worksheet_rows_range("Bob's Sheet", 5, 28) == "'Bob''s Sheet'!A5:AB"
+
+    def test_worksheet_range_builds_column_letters(self):
+        assert main._worksheet_range("Sheet1", 1) == "'Sheet1'!A:A"
+        assert main._worksheet_range("Sheet1", 26) == "'Sheet1'!Z:Z"
+        assert main._worksheet_range("Sheet1", 28) == "'Sheet1'!AB:AB"
+        assert main._worksheet_range("Sheet1", 703) == "'Sheet1'!AAA:AAA"
+
+
 class TestLoadResponsesToSheet:
     def test_load_responses_to_sheet_combines_multiple_worksheets(self, mocker):
-        """Test that _load_responses_to_sheet iterates through all worksheets and combines data"""
-        # Setup mock worksheets with different data
-        worksheet1_data = pd.DataFrame(
-            {
-                "GlobalID": ["id1", "id2"],
-                "Local Health District:": ["LHD1", "LHD1"],
-                "Data": ["data1", "data2"],
-            }
+        """Test that _load_responses_to_sheet checks the GlobalIDs in all worksheets"""
+        mock_worksheet1 = _mock_worksheet(
+            mocker,
+            "Worksheet1",
+            pd.DataFrame(
+                {
+                    "GlobalID": ["id1", "id2"],
+                    "Local Health District:": ["LHD1", "LHD1"],
+                    "Data": ["data1", "data2"],
+                }
+            ),
         )
-        worksheet2_data = pd.DataFrame(
-            {
-                "GlobalID": ["id3", "id4"],
-                "Local Health District:": ["LHD1", "LHD1"],
-                "Data": ["data3", "data4"],
-            }
+        mock_worksheet2 = _mock_worksheet(
+            mocker,
+            "Worksheet2",
+            pd.DataFrame(
+                {
+                    "Data": ["data3", "data4"],
+                    "GlobalID": ["id3", "id4"],
+                    "Local Health District:": ["LHD1", "LHD1"],
+                }
+            ),
         )
-        
-        # Mock worksheet objects
-        mock_worksheet1 = mocker.Mock()
-        mock_worksheet1.get_as_df.return_value = worksheet1_data
-        mock_worksheet1.title = "Worksheet1"
-        
-        mock_worksheet2 = mocker.Mock()
-        mock_worksheet2.get_as_df.return_value = worksheet2_data
-        mock_worksheet2.title = "Worksheet2"
-        
-        # Mock spreadsheet to return both worksheets
+
         mock_spreadsheet = mocker.Mock()
         mock_spreadsheet.worksheets.return_value = [mock_worksheet1, mock_worksheet2]
-        mock_spreadsheet.worksheet.return_value = mock_worksheet1  # For writing back
-        
-        # Mock gsheets_client
-        mock_gsheets_client = mocker.Mock()
-        mock_gsheets_client.open_by_key.return_value = mock_spreadsheet
-        
-        mocker.patch("palletjack.utils.authorize_pygsheets", return_value=mock_gsheets_client)
-        
-        # Setup skid instance
+        mock_spreadsheet.worksheet.return_value = mock_worksheet1  #: For writing back
+
         skid_instance = mocker.Mock()
         skid_instance.lhd_sheet_ids = {"LHD1": "sheet_id_123"}
-        skid_instance.secrets.GOOGLE_CREDENTIALS = "mock_credentials"
-        
-        # Create responses with a new row
+        skid_instance._gsheets_client.open_by_key.return_value = mock_spreadsheet
+        batch_get = _mock_values_batch_get(skid_instance, mock_worksheet1, mock_worksheet2)
+
         responses = pd.DataFrame(
             {
                 "GlobalID": ["id1", "id2", "id3", "id4", "id5"],
@@ -522,104 +959,91 @@ class TestLoadResponsesToSheet:
                 "Data": ["data1", "data2", "data3", "data4", "data5_new"],
             }
         )
-        
-        # Call the method
+
         result = main.Skid._load_responses_to_sheet(skid_instance, responses, "LHD1")
-        
-        # Verify worksheets() was called to get all worksheets
+
         mock_spreadsheet.worksheets.assert_called_once()
-        
-        # Verify all worksheets were read during iteration
-        assert mock_worksheet1.get_as_df.call_count == 2  # Once during iteration, once to get size for appending
-        assert mock_worksheet2.get_as_df.call_count == 1  # Once during iteration
-        
-        # Verify only the new row (id5) was added
+
+        #: The header rows and then only the GlobalID columns are read, each in one batched request, and then just the
+        #: first worksheet's rows below its last GlobalID to find where to append
+        assert batch_get.call_count == 3
+        assert batch_get.call_args_list[0].args[1] == ["'Worksheet1'!1:1", "'Worksheet2'!1:1"]
+        assert batch_get.call_args_list[1].args[1] == ["'Worksheet1'!A:A", "'Worksheet2'!B:B"]
+        assert batch_get.call_args_list[2].args[1] == ["'Worksheet1'!A4:Z"]
+
+        #: Only the new row (id5) was added
         assert result == 1
-        
-        # Verify set_dataframe was called with the new data
         mock_worksheet1.set_dataframe.assert_called_once()
-        call_args = mock_worksheet1.set_dataframe.call_args
-        added_df = call_args[0][0]
+        added_df = mock_worksheet1.set_dataframe.call_args[0][0]
         assert len(added_df) == 1
         assert added_df["GlobalID"].iloc[0] == "id5"
 
+    def test_load_responses_to_sheet_skips_sheet_when_no_responses(self, mocker):
+        skid_instance = mocker.Mock()
+        skid_instance.lhd_sheet_ids = {"LHD1": "sheet_id_123"}
+
+        responses = pd.DataFrame({"GlobalID": [], "Local Health District:": []})
+
+        result = main.Skid._load_responses_to_sheet(skid_instance, responses, "LHD1")
+
+        assert result == 0
+        skid_instance._gsheets_client.open_by_key.assert_not_called()
+
     def test_load_responses_to_sheet_handles_empty_worksheets(self, mocker):
-        """Test that empty worksheets are skipped when combining data"""
-        # Setup mock worksheets with one empty
-        worksheet1_data = pd.DataFrame(
-            {
-                "GlobalID": ["id1", "id2"],
-                "Local Health District:": ["LHD1", "LHD1"],
-            }
+        """Test that empty worksheets are skipped when gathering GlobalIDs"""
+        mock_worksheet1 = _mock_worksheet(
+            mocker,
+            "Worksheet1",
+            pd.DataFrame(
+                {
+                    "GlobalID": ["id1", "id2"],
+                    "Local Health District:": ["LHD1", "LHD1"],
+                }
+            ),
         )
-        worksheet2_data = pd.DataFrame()  # Empty worksheet
-        
-        mock_worksheet1 = mocker.Mock()
-        mock_worksheet1.get_as_df.return_value = worksheet1_data
-        mock_worksheet1.title = "Worksheet1"
-        
-        mock_worksheet2 = mocker.Mock()
-        mock_worksheet2.get_as_df.return_value = worksheet2_data
-        mock_worksheet2.title = "Worksheet2"
-        
+        mock_worksheet2 = _mock_worksheet(mocker, "Worksheet2", pd.DataFrame())
+
         mock_spreadsheet = mocker.Mock()
         mock_spreadsheet.worksheets.return_value = [mock_worksheet1, mock_worksheet2]
         mock_spreadsheet.worksheet.return_value = mock_worksheet1
-        
-        mock_gsheets_client = mocker.Mock()
-        mock_gsheets_client.open_by_key.return_value = mock_spreadsheet
-        
-        mocker.patch("palletjack.utils.authorize_pygsheets", return_value=mock_gsheets_client)
-        
+
         skid_instance = mocker.Mock()
         skid_instance.lhd_sheet_ids = {"LHD1": "sheet_id_123"}
-        skid_instance.secrets.GOOGLE_CREDENTIALS = "mock_credentials"
-        
+        skid_instance._gsheets_client.open_by_key.return_value = mock_spreadsheet
+        batch_get = _mock_values_batch_get(skid_instance, mock_worksheet1, mock_worksheet2)
+
         responses = pd.DataFrame(
             {
                 "GlobalID": ["id1", "id2"],
                 "Local Health District:": ["LHD1", "LHD1"],
             }
         )
-        
+
         result = main.Skid._load_responses_to_sheet(skid_instance, responses, "LHD1")
-        
-        # Should have read both worksheets
-        assert mock_worksheet1.get_as_df.call_count == 1
-        assert mock_worksheet2.get_as_df.call_count == 1
-        
-        # No new data to add
+
+        #: Should have checked both worksheets' headers but only read the column from the non-empty one
+        assert batch_get.call_count == 2
+        assert batch_get.call_args_list[0].args[1] == ["'Worksheet1'!1:1", "'Worksheet2'!1:1"]
+        assert batch_get.call_args_list[1].args[1] == ["'Worksheet1'!A:A"]
+
+        #: No new data to add
         assert result == 0
+        mock_worksheet1.set_dataframe.assert_not_called()
 
     def test_load_responses_to_sheet_handles_all_empty_worksheets_without_keyerror(self, mocker):
-        """Test that when all worksheets are empty, an empty DataFrame with GlobalID column is created
-        and no KeyError is raised when checking for new records"""
-        # Setup mock worksheets that are all empty
-        worksheet1_data = pd.DataFrame()  # Empty worksheet
-        worksheet2_data = pd.DataFrame()  # Empty worksheet
-        
-        mock_worksheet1 = mocker.Mock()
-        mock_worksheet1.get_as_df.return_value = worksheet1_data
-        mock_worksheet1.title = "Worksheet1"
-        
-        mock_worksheet2 = mocker.Mock()
-        mock_worksheet2.get_as_df.return_value = worksheet2_data
-        mock_worksheet2.title = "Worksheet2"
-        
+        """Test that when all worksheets are empty all the responses are added without raising a KeyError"""
+        mock_worksheet1 = _mock_worksheet(mocker, "Worksheet1", pd.DataFrame())
+        mock_worksheet2 = _mock_worksheet(mocker, "Worksheet2", pd.DataFrame())
+
         mock_spreadsheet = mocker.Mock()
         mock_spreadsheet.worksheets.return_value = [mock_worksheet1, mock_worksheet2]
         mock_spreadsheet.worksheet.return_value = mock_worksheet1
-        
-        mock_gsheets_client = mocker.Mock()
-        mock_gsheets_client.open_by_key.return_value = mock_spreadsheet
-        
-        mocker.patch("palletjack.utils.authorize_pygsheets", return_value=mock_gsheets_client)
-        
+
         skid_instance = mocker.Mock()
         skid_instance.lhd_sheet_ids = {"LHD1": "sheet_id_123"}
-        skid_instance.secrets.GOOGLE_CREDENTIALS = "mock_credentials"
-        
-        # Create responses with new data
+        skid_instance._gsheets_client.open_by_key.return_value = mock_spreadsheet
+        batch_get = _mock_values_batch_get(skid_instance, mock_worksheet1, mock_worksheet2)
+
         responses = pd.DataFrame(
             {
                 "GlobalID": ["id1", "id2", "id3"],
@@ -627,130 +1051,166 @@ class TestLoadResponsesToSheet:
                 "Data": ["data1", "data2", "data3"],
             }
         )
-        
-        # Call the method - this should not raise a KeyError
+
         result = main.Skid._load_responses_to_sheet(skid_instance, responses, "LHD1")
-        
-        # Should have read all worksheets during iteration, plus first worksheet again to get size
-        assert mock_worksheet1.get_as_df.call_count == 2  # Once during iteration, once to get size for appending
-        assert mock_worksheet2.get_as_df.call_count == 1  # Once during iteration
-        
-        # All responses should be added since live_dataframe is empty
+
+        #: All responses should be added since there aren't any existing GlobalIDs, and there weren't any columns to read
         assert result == 3
-        
-        # Verify set_dataframe was called with all the new data
+        assert batch_get.call_count == 2
+        assert batch_get.call_args_list[1].args[1] == ["'Worksheet1'!A2:Z"]
         mock_worksheet1.set_dataframe.assert_called_once()
-        call_args = mock_worksheet1.set_dataframe.call_args
-        added_df = call_args[0][0]
+        added_df = mock_worksheet1.set_dataframe.call_args[0][0]
         assert len(added_df) == 3
         assert set(added_df["GlobalID"].tolist()) == {"id1", "id2", "id3"}
 
     def test_load_responses_appends_to_empty_first_worksheet_at_row_2(self, mocker):
         """Test that new rows are appended at row 2 (header row + 1) when first worksheet is empty"""
-        # Setup mock worksheets - first is empty, second has data
-        worksheet1_data = pd.DataFrame()  # Empty first worksheet
-        worksheet2_data = pd.DataFrame(
-            {
-                "GlobalID": ["id1", "id2"],
-                "Local Health District:": ["LHD1", "LHD1"],
-            }
+        mock_worksheet1 = _mock_worksheet(mocker, "Worksheet1", pd.DataFrame())
+        mock_worksheet2 = _mock_worksheet(
+            mocker,
+            "Worksheet2",
+            pd.DataFrame(
+                {
+                    "GlobalID": ["id1", "id2"],
+                    "Local Health District:": ["LHD1", "LHD1"],
+                }
+            ),
         )
-        
-        mock_worksheet1 = mocker.Mock()
-        mock_worksheet1.get_as_df.return_value = worksheet1_data
-        mock_worksheet1.title = "Worksheet1"
-        
-        mock_worksheet2 = mocker.Mock()
-        mock_worksheet2.get_as_df.return_value = worksheet2_data
-        mock_worksheet2.title = "Worksheet2"
-        
+
         mock_spreadsheet = mocker.Mock()
         mock_spreadsheet.worksheets.return_value = [mock_worksheet1, mock_worksheet2]
         mock_spreadsheet.worksheet.return_value = mock_worksheet1
-        
-        mock_gsheets_client = mocker.Mock()
-        mock_gsheets_client.open_by_key.return_value = mock_spreadsheet
-        
-        mocker.patch("palletjack.utils.authorize_pygsheets", return_value=mock_gsheets_client)
-        
+
         skid_instance = mocker.Mock()
         skid_instance.lhd_sheet_ids = {"LHD1": "sheet_id_123"}
-        skid_instance.secrets.GOOGLE_CREDENTIALS = "mock_credentials"
-        
-        # Create responses with new data
+        skid_instance._gsheets_client.open_by_key.return_value = mock_spreadsheet
+        _mock_values_batch_get(skid_instance, mock_worksheet1, mock_worksheet2)
+
         responses = pd.DataFrame(
             {
                 "GlobalID": ["id3", "id4"],
                 "Local Health District:": ["LHD1", "LHD1"],
             }
         )
-        
+
         result = main.Skid._load_responses_to_sheet(skid_instance, responses, "LHD1")
-        
-        # Should add 2 new rows
+
         assert result == 2
-        
-        # Verify set_dataframe was called with correct row index
-        # Empty worksheet has 0 rows, so new data should start at row 2 (0 + 2)
+
+        #: Empty worksheet has 0 rows, so new data should start at row 2 (0 + 2)
         mock_worksheet1.set_dataframe.assert_called_once()
-        call_args = mock_worksheet1.set_dataframe.call_args
-        row_index = call_args[0][1][0]  # Get the row position (first element of the tuple)
+        row_index = mock_worksheet1.set_dataframe.call_args[0][1][0]
         assert row_index == 2, f"Expected row index 2, got {row_index}"
 
     def test_load_responses_appends_after_existing_rows_in_first_worksheet(self, mocker):
         """Test that new rows are appended after existing rows in the first worksheet"""
-        # Setup mock worksheets - first has 3 rows, second has different data
-        worksheet1_data = pd.DataFrame(
-            {
-                "GlobalID": ["id1", "id2", "id3"],
-                "Local Health District:": ["LHD1", "LHD1", "LHD1"],
-            }
+        mock_worksheet1 = _mock_worksheet(
+            mocker,
+            "Worksheet1",
+            pd.DataFrame(
+                {
+                    "GlobalID": ["id1", "id2", "id3"],
+                    "Local Health District:": ["LHD1", "LHD1", "LHD1"],
+                }
+            ),
         )
-        worksheet2_data = pd.DataFrame(
-            {
-                "GlobalID": ["id4", "id5"],
-                "Local Health District:": ["LHD1", "LHD1"],
-            }
+        mock_worksheet2 = _mock_worksheet(
+            mocker,
+            "Worksheet2",
+            pd.DataFrame(
+                {
+                    "GlobalID": ["id4", "id5"],
+                    "Local Health District:": ["LHD1", "LHD1"],
+                }
+            ),
         )
-        
-        mock_worksheet1 = mocker.Mock()
-        mock_worksheet1.get_as_df.return_value = worksheet1_data
-        mock_worksheet1.title = "Worksheet1"
-        
-        mock_worksheet2 = mocker.Mock()
-        mock_worksheet2.get_as_df.return_value = worksheet2_data
-        mock_worksheet2.title = "Worksheet2"
-        
+
         mock_spreadsheet = mocker.Mock()
         mock_spreadsheet.worksheets.return_value = [mock_worksheet1, mock_worksheet2]
         mock_spreadsheet.worksheet.return_value = mock_worksheet1
-        
-        mock_gsheets_client = mocker.Mock()
-        mock_gsheets_client.open_by_key.return_value = mock_spreadsheet
-        
-        mocker.patch("palletjack.utils.authorize_pygsheets", return_value=mock_gsheets_client)
-        
+
         skid_instance = mocker.Mock()
         skid_instance.lhd_sheet_ids = {"LHD1": "sheet_id_123"}
-        skid_instance.secrets.GOOGLE_CREDENTIALS = "mock_credentials"
-        
-        # Create responses with new data not in either worksheet
+        skid_instance._gsheets_client.open_by_key.return_value = mock_spreadsheet
+        _mock_values_batch_get(skid_instance, mock_worksheet1, mock_worksheet2)
+
         responses = pd.DataFrame(
             {
                 "GlobalID": ["id1", "id2", "id3", "id4", "id5", "id6", "id7"],
                 "Local Health District:": ["LHD1", "LHD1", "LHD1", "LHD1", "LHD1", "LHD1", "LHD1"],
             }
         )
-        
+
         result = main.Skid._load_responses_to_sheet(skid_instance, responses, "LHD1")
-        
-        # Should add 2 new rows (id6 and id7 are not in any worksheet)
+
+        #: id6 and id7 are not in any worksheet
         assert result == 2
-        
-        # Verify set_dataframe was called with correct row index
-        # First worksheet has 3 rows, so new data should start at row 5 (3 + 2)
+
+        #: First worksheet has 3 rows, so new data should start at row 5 (3 + 2)
         mock_worksheet1.set_dataframe.assert_called_once()
-        call_args = mock_worksheet1.set_dataframe.call_args
-        row_index = call_args[0][1][0]  # Get the row position (first element of the tuple)
+        row_index = mock_worksheet1.set_dataframe.call_args[0][1][0]
         assert row_index == 5, f"Expected row index 5, got {row_index}"
 
+    def test_load_responses_appends_after_trailing_rows_without_global_ids(self, mocker):
+        """Test that hand-entered rows without a GlobalID at the bottom of the first worksheet aren't overwritten"""
+        mock_worksheet1 = _mock_worksheet(
+            mocker,
+            "Worksheet1",
+            pd.DataFrame(
+                {
+                    "GlobalID": ["id1", "id2", "", ""],
+                    "Local Health District:": ["LHD1", "LHD1", "", ""],
+                    "Notes": ["", "", "called the facility", "follow up next week"],
+                }
+            ),
+        )
+
+        mock_spreadsheet = mocker.Mock()
+        mock_spreadsheet.worksheets.return_value = [mock_worksheet1]
+        mock_spreadsheet.worksheet.return_value = mock_worksheet1
+
+        skid_instance = mocker.Mock()
+        skid_instance.lhd_sheet_ids = {"LHD1": "sheet_id_123"}
+        skid_instance._gsheets_client.open_by_key.return_value = mock_spreadsheet
+        _mock_values_batch_get(skid_instance, mock_worksheet1)
+
+        responses = pd.DataFrame(
+            {
+                "GlobalID": ["id1", "id2", "id3"],
+                "Local Health District:": ["LHD1", "LHD1", "LHD1"],
+            }
+        )
+
+        result = main.Skid._load_responses_to_sheet(skid_instance, responses, "LHD1")
+
+        assert result == 1
+
+        #: Header plus four rows, even though the GlobalID column ends at row 3
+        row_index = mock_worksheet1.set_dataframe.call_args[0][1][0]
+        assert row_index == 6, f"Expected row index 6, got {row_index}"
+
+    def test_load_responses_skips_rows_below_read_when_first_worksheet_is_full(self, mocker):
+        """Test that the rows below the last GlobalID aren't requested when there aren't any rows below it"""
+        mock_worksheet1 = _mock_worksheet(
+            mocker,
+            "Worksheet1",
+            pd.DataFrame({"GlobalID": ["id1", "id2"], "Local Health District:": ["LHD1", "LHD1"]}),
+        )
+        mock_worksheet1.rows = 3
+
+        mock_spreadsheet = mocker.Mock()
+        mock_spreadsheet.worksheets.return_value = [mock_worksheet1]
+        mock_spreadsheet.worksheet.return_value = mock_worksheet1
+
+        skid_instance = mocker.Mock()
+        skid_instance.lhd_sheet_ids = {"LHD1": "sheet_id_123"}
+        skid_instance._gsheets_client.open_by_key.return_value = mock_spreadsheet
+        batch_get = _mock_values_batch_get(skid_instance, mock_worksheet1)
+
+        responses = pd.DataFrame({"GlobalID": ["id3"], "Local Health District:": ["LHD1"]})
+
+        result = main.Skid._load_responses_to_sheet(skid_instance, responses, "LHD1")
+
+        assert result == 1
+        assert batch_get.call_count == 2
+        assert mock_worksheet1.set_dataframe.call_args[0][1][0] == 4